@@ -1,12 +1,97 @@
 # from dotenv import load_dotenv
 # from programgarden import Programgarden
 import os
-import json
-import time
+import sys
+import mmap
+import pickle
+import signal
+import threading
+import struct
+import tempfile
+import importlib.util
+from typing import Any
+import msgspec
 
 # load_dotenv()
 
+# Cache header: (st_mtime_ns, st_size) of the source file the pickle was built from
+CACHE_KEY_FORMAT = struct.Struct('<qq')
 
+# Built once and reused for every (re)load. The config must be a JSON object; its keys are
+# left free-form since dsl.txt doesn't follow a fixed schema yet.
+DSL_DECODER = msgspec.json.Decoder(dict[str, Any])
+
+
+def load_compiled_dsl(full_path, st):
+    """
+    Import the dsl_config.py module the manager API writes next to the config on /update-data.
+    Returns None if it is missing or was generated from a different version of the file.
+    """
+    module_path = os.path.join(os.path.dirname(full_path), 'dsl_config.py')
+    if not os.path.exists(module_path):
+        return None
+    try:
+        # The source loader reuses the module's cached .pyc, so this skips both read and parse
+        spec = importlib.util.spec_from_file_location('dsl_config', module_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        if getattr(module, 'SOURCE_KEY', None) != (st.st_mtime_ns, st.st_size):
+            return None
+        return getattr(module, 'CONFIG', None)
+    except Exception as e:
+        print(f"Ignoring unloadable compiled DSL {module_path}: {e}")
+        return None
+
+
+def load_dsl(full_path):
+    """Load the DSL config, reusing a compiled or pickled copy while the source file is unchanged."""
+    st = os.stat(full_path)
+    dsl_setup_dict = load_compiled_dsl(full_path, st)
+    if dsl_setup_dict is not None:
+        return dsl_setup_dict
+
+    key = CACHE_KEY_FORMAT.pack(st.st_mtime_ns, st.st_size)
+    # Kept in the container's own filesystem, never in the bind-mounted data directory that
+    # /update-data writes to: unpickling a file a caller can upload would run arbitrary code.
+    cache_name = os.path.splitext(os.path.basename(full_path))[0] + '.cache.pkl'
+    cache_path = os.path.join(tempfile.gettempdir(), cache_name)
+
+    # Warm start: unpickling skips JSON tokenization entirely
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as f:
+                if f.read(CACHE_KEY_FORMAT.size) == key:
+                    return pickle.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable DSL cache {cache_path}: {e}")
+
+    # Decode straight out of the mapped page cache: no copy into a bytes object
+    # and no separate UTF-8 decode pass
+    with open(full_path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+            memoryview(mm) as view:
+        dsl_setup_dict = DSL_DECODER.decode(view)
+
+    try:
+        with open(cache_path, 'wb') as f:
+            f.write(key)
+            pickle.dump(dsl_setup_dict, f, protocol=5)
+    except OSError as e:
+        print(f"Could not write DSL cache {cache_path}: {e}")
+    return dsl_setup_dict
+
+
+def reload_dsl(full_path):
+    """SIGHUP handler: re-read the DSL config in-process instead of restarting the container."""
+    global dsl_setup_dict
+    print(f"Reloading config from: {full_path}")
+    try:
+        dsl_setup_dict = load_dsl(full_path)
+        print("Successfully reloaded dsl data:")
+        print(dsl_setup_dict)
+    except Exception as e:
+        # Keep running with the previous config
+        print(f"Error reading or parsing the file: {e}")
 
 
 if __name__ == "__main__":
@@ -22,16 +107,23 @@ if __name__ == "__main__":
     # os.path.join is the best way to create file paths
     full_path = os.path.join(DATA_DIRECTORY, CONFIG_FILE)
 
+    # Install the signal handlers before the first load: as PID 1 in the container, signals
+    # without a handler are dropped, so a SIGHUP sent right after start would be lost.
+    # SIGTERM is ignored unless we handle it explicitly.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    if hasattr(signal, 'SIGHUP'):
+        # The manager API sends SIGHUP after /update-data rewrites the config. It is held back
+        # during the initial load (and delivered right after) so that load can't overwrite it.
+        signal.signal(signal.SIGHUP, lambda *_: reload_dsl(full_path))
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGHUP})
+
     print(f"Attempting to read config from: {full_path}")
 
+    dsl_setup_dict = None
     if os.path.exists(full_path):
         try:
-            # Use 'with' to safely open and automatically close the file
-            with open(full_path, 'r') as f:
-                dsl_setup = f.read()
-                
+            dsl_setup_dict = load_dsl(full_path)
             print("Successfully loaded dsl data:")
-            dsl_setup_dict = json.loads(dsl_setup)
             print(dsl_setup_dict)
 
         except Exception as e:
@@ -40,6 +132,9 @@ if __name__ == "__main__":
         print(f"Error: Config file not found at {full_path}")
         print("Please ensure the volume is mounted correctly and the file exists.")
 
+    if hasattr(signal, 'SIGHUP'):
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGHUP})
+
     # pg = Programgarden()
 
     # # 전략 수행 응답 콜백
@@ -52,9 +147,14 @@ if __name__ == "__main__":
     #     callback=lambda message: print(f"Real Order Message: {message.get('order_type')}")
     # )
 
-    while True:
-        # print("something")
-        time.sleep(1)
+    # Block in the kernel until a signal arrives instead of waking up every second.
+    if hasattr(signal, 'pause'):
+        # pause() returns after each handled signal (e.g. a SIGHUP reload)
+        while True:
+            signal.pause()
+    else:
+        # Windows has no signal.pause()
+        threading.Event().wait()
 
     # pg.run(
     #     system={
@@ -1,6 +1,16 @@
 import os
+import re
+import json
 import time
+import stat
+import hashlib
+import tempfile
+import threading
+import anyio
 import docker
+from docker.utils import tar
+from docker.utils.build import exclude_paths
+from cachetools import TTLCache
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 
@@ -9,57 +19,311 @@ CONTAINER_NAME = "my-trading-bot-managed"
 IMAGE_NAME = "trading-bot" # The tag for the image
 HOST_DATA_PATH = os.path.abspath("./app/trading_data")
 CONTAINER_DATA_PATH = "/app/data"
+# Named volume (bound to HOST_DATA_PATH) and bridge network, created once at API startup
+DATA_VOLUME_NAME = "trading-data"
+NETWORK_NAME = "trading-net"
 # --- NEW ---: Path to the directory containing your Dockerfile
 # This assumes you run the API from your project's root folder.
 BUILD_CONTEXT_PATH = os.path.abspath(".") 
+# Worker threads FastAPI may use to run the (blocking) endpoint handlers concurrently.
+THREADPOOL_SIZE = 100
+# Docker API client tuning: per-call timeout (seconds) and keep-alive connections
+# kept open to the daemon, one per worker thread.
+DOCKER_TIMEOUT = 10
+DOCKER_POOL_SIZE = THREADPOOL_SIZE
+# How long (seconds) a /status result is served from cache, so polling clients share one daemon call.
+STATUS_CACHE_TTL = 0.5
+# Seconds a freshly (re)started container must stay up before it's reported as running,
+# so a bot that crashes on startup is caught.
+START_GRACE_PERIOD = 1
+# Container log lines included in failure responses, so a crash-looping bot can't balloon them.
+FAILURE_LOG_TAIL = 200
+# The bot's config file, and the Python module it is pre-compiled into so the bot can import
+# it instead of parsing JSON on every start (see _write_dsl_module).
+DSL_CONFIG_FILE = "dsl.txt"
+DSL_MODULE_FILE = "dsl_config.py"
+# Image label marking bots that reload their config on SIGHUP (set in the Dockerfile)
+RELOAD_LABEL = "reload-on-hup"
+
+
+# --- Build Context ---
+def _read_dockerignore(path):
+    """Returns the exclude patterns (as a tuple) from `path`/.dockerignore, parsed the way docker-py's build API does."""
+    dockerignore = os.path.join(path, '.dockerignore')
+    if not os.path.exists(dockerignore): return []
+    with open(dockerignore) as f:
+        lines = [line.strip() for line in f.read().splitlines()]
+    return tuple(line for line in lines if line and not line.startswith('#'))
+
+# Parsed once at import rather than on every /rebuild. Kept as a tuple: docker-py appends to the
+# pattern list it's given, so every call site must pass its own list() copy.
+BUILD_CONTEXT_EXCLUDE = _read_dockerignore(BUILD_CONTEXT_PATH)
+
+def _build_context_digest():
+    """
+    Returns a short digest of the build context: the path, mtime and size of every file that
+    .dockerignore lets through. Images are tagged with it so an unchanged context can skip the build.
+    """
+    h = hashlib.blake2b()
+    # exclude_paths() yields the paths that are *included* in the context
+    for rel_path in sorted(exclude_paths(BUILD_CONTEXT_PATH, list(BUILD_CONTEXT_EXCLUDE))):
+        st = os.stat(os.path.join(BUILD_CONTEXT_PATH, rel_path))
+        if not stat.S_ISREG(st.st_mode): continue
+        h.update(rel_path.encode('utf-8') + b'\0')
+        h.update(st.st_mtime_ns.to_bytes(8, 'little') + st.st_size.to_bytes(8, 'little'))
+    return h.hexdigest()[:12]
 
 
 # --- FastAPI and Docker Client Initialization ---
 app = FastAPI(title="Docker Bot Manager API")
 try:
-    client = docker.from_env()
+    client = docker.from_env(timeout=DOCKER_TIMEOUT, max_pool_size=DOCKER_POOL_SIZE)
     client.ping()
     print("Successfully connected to Docker daemon.")
 except Exception as e:
     print(f"Error connecting to Docker daemon: {e}")
     client = None
 
+@app.on_event("startup")
+async def configure_threadpool():
+    # Handlers stay sync (docker-py is blocking) and run in anyio's threadpool; raise its
+    # default limit of 40 so slow operations like /rebuild don't queue up quick /status calls.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+@app.on_event("startup")
+def prepare_docker_resources():
+    # Declared once here so /start can refer to them by name instead of resolving a host path each time
+    if not client: return
+    try:
+        try:
+            volume = client.volumes.get(DATA_VOLUME_NAME)
+            if (volume.attrs.get('Options') or {}).get('device') != HOST_DATA_PATH:
+                print(f"Warning: volume '{DATA_VOLUME_NAME}' is not bound to {HOST_DATA_PATH}. Remove it to recreate; /start will fail until then.")
+        except docker.errors.NotFound:
+            client.volumes.create(
+                name=DATA_VOLUME_NAME, driver='local',
+                driver_opts={'type': 'none', 'device': HOST_DATA_PATH, 'o': 'bind'}
+            )
+            print(f"Created volume '{DATA_VOLUME_NAME}' bound to {HOST_DATA_PATH}.")
+        try:
+            client.networks.get(NETWORK_NAME)
+        except docker.errors.NotFound:
+            client.networks.create(NETWORK_NAME, driver='bridge')
+            print(f"Created network '{NETWORK_NAME}'.")
+    except Exception as e:
+        print(f"Error preparing Docker volume/network: {e}")
+
+@app.on_event("shutdown")
+def close_docker_client():
+    if client: client.close()
+
 # --- Pydantic Model for Request Body ---
 class DataUpdateRequest(BaseModel):
     filename: str
     content: str
 
+# --- /status Cache ---
+# TTLCache isn't thread-safe and the handlers run in a threadpool, so guard it with a lock.
+_status_cache = TTLCache(maxsize=4, ttl=STATUS_CACHE_TTL)
+_status_cache_lock = threading.Lock()
+
+def _invalidate_status():
+    with _status_cache_lock: _status_cache.pop(CONTAINER_NAME, None)
+
+# --- Container State Helpers ---
+def _container_status():
+    """Returns the container's current status with a single inspect call (raises NotFound if missing)."""
+    return client.api.inspect_container(CONTAINER_NAME)['State']['Status']
+
+def _failure_logs():
+    """Returns the last FAILURE_LOG_TAIL lines of the container's output for error responses."""
+    return client.api.logs(CONTAINER_NAME, stdout=True, stderr=True, tail=FAILURE_LOG_TAIL).decode('utf-8', 'replace')
+
+def _verify_docker_resources():
+    """
+    Raises a 500 unless the data volume (bound to HOST_DATA_PATH) and the network created at startup
+    exist. Otherwise Docker would silently create an empty volume and the bot would read a different
+    directory than /update-data writes to.
+    """
+    try:
+        volume = client.api.inspect_volume(DATA_VOLUME_NAME)
+    except docker.errors.NotFound:
+        raise HTTPException(status_code=500, detail=f"Volume '{DATA_VOLUME_NAME}' is missing. Restart the API to create it.")
+    device = (volume.get('Options') or {}).get('device')
+    if device != HOST_DATA_PATH:
+        raise HTTPException(status_code=500, detail=f"Volume '{DATA_VOLUME_NAME}' is bound to {device}, not {HOST_DATA_PATH}. Remove it and restart the API.")
+    try:
+        client.api.inspect_network(NETWORK_NAME)
+    except docker.errors.NotFound:
+        raise HTTPException(status_code=500, detail=f"Network '{NETWORK_NAME}' is missing. Restart the API to create it.")
+
+def _poll_for_state(target_states, timeout=10):
+    """
+    Polling fallback for _wait_for_state. Backs off exponentially from 25 ms to 0.5 s, since most
+    transitions finish within a few hundred milliseconds and a fixed 1 s sleep would add latency.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.025
+    status = _container_status()
+    while status not in target_states and time.monotonic() < deadline:
+        time.sleep(delay); delay = min(delay * 1.6, 0.5)
+        status = _container_status()
+    return status
+
+def _wait_for_state(target_states, timeout=10):
+    """
+    Waits until the container reaches one of `target_states` or `timeout` seconds pass,
+    and returns its last known status. Instead of polling, it subscribes to the daemon's
+    event stream and only re-inspects the container when a lifecycle event arrives.
+    """
+    deadline = time.monotonic() + timeout
+    since = int(time.time())
+    status = _container_status()
+    if status in target_states: return status
+    events = client.events(
+        since=since, until=int(time.time()) + timeout, decode=True,
+        filters={'container': CONTAINER_NAME, 'event': ['start', 'die', 'stop']}
+    )
+    try:
+        for _ in events:
+            status = _container_status()
+            if status in target_states: return status
+    finally:
+        events.close()
+    # docker-py surfaces a refused or dropped event stream as a silently ended iteration,
+    # so if time is left, poll out the rest of the timeout instead of giving up early
+    remaining = deadline - time.monotonic()
+    if remaining > 0: return _poll_for_state(target_states, remaining)
+    return status
+
+def _watch_for_crash(grace=START_GRACE_PERIOD):
+    """
+    Called once a just-started container reports `running`: watches the event stream for a
+    `die` event during a `grace` period and returns the container's status afterwards.
+    """
+    deadline = time.monotonic() + grace
+    # Nanosecond-precision timestamp: the daemon reads the fraction as nanoseconds, and a
+    # whole-second `since` would replay the `die` of a restart's own stop phase
+    since = f"{time.time():.9f}"
+    events = client.events(
+        since=since, until=f"{time.time() + grace:.9f}", decode=True,
+        filters={'container': CONTAINER_NAME, 'event': ['die']}
+    )
+    try:
+        for _ in events: return _container_status()
+    finally:
+        events.close()
+    # The stream ended early (e.g. the daemon refused it): poll out the rest of the window
+    remaining = deadline - time.monotonic()
+    if remaining > 0: return _poll_for_state(['exited', 'dead'], remaining)
+    return _container_status()
+
+# --- Data File Helpers ---
+def _write_atomic(path, data):
+    """
+    Writes `data` (bytes) to a fsynced temp file and atomically renames it over `path`, so a
+    crash mid-write can never leave the bot a truncated file. Each call gets its own temp file,
+    so concurrent writes to the same path don't clobber each other (the last rename wins).
+    """
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data); f.flush(); os.fsync(f.fileno())
+        # mkstemp creates the file 0600; keep the target's mode (or a normal 0644 for new files)
+        os.chmod(tmp_path, os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+    # fsync the directory too, so the rename itself survives a crash
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+def _is_reserved_data_file(filename):
+    """
+    True if `filename` must not be written through /update-data: the compiled DSL module and its
+    __pycache__ (which the bot imports as code), pickle caches, or any path outside HOST_DATA_PATH.
+    """
+    path = os.path.normpath(os.path.join(HOST_DATA_PATH, filename))
+    if os.path.commonpath([path, HOST_DATA_PATH]) != HOST_DATA_PATH or path == HOST_DATA_PATH: return True
+    parts = os.path.relpath(path, HOST_DATA_PATH).split(os.sep)
+    return parts[-1] == DSL_MODULE_FILE or parts[-1].endswith('.cache.pkl') or '__pycache__' in parts
+
+def _reject_constant(name):
+    raise ValueError(f"{name} is not valid JSON")
+
+def _write_dsl_module(dsl_path, content):
+    """
+    Writes the parsed DSL config next to `dsl_path` as a Python module (`CONFIG = {...}`).
+    The bot imports it instead of parsing JSON, and Python caches its bytecode after the
+    first import. SOURCE_KEY records the (mtime, size) of the dsl.txt it was generated
+    from, so the bot ignores it once dsl.txt is changed by other means.
+    """
+    module_path = os.path.join(os.path.dirname(dsl_path), DSL_MODULE_FILE)
+    try:
+        # NaN/Infinity have no Python literal form (and the bot's parser rejects them too)
+        config = json.loads(content, parse_constant=_reject_constant)
+        # The bot only accepts a JSON object at the top level
+        if not isinstance(config, dict): raise ValueError("top-level value is not a JSON object")
+    except ValueError as e:
+        # Leave invalid JSON for the bot to report; just make sure no stale module is used
+        print(f"Not compiling {dsl_path}: {e}")
+        if os.path.exists(module_path): os.remove(module_path)
+        return
+    st = os.stat(dsl_path)
+    source = f"SOURCE_KEY = {(st.st_mtime_ns, st.st_size)!r}\nCONFIG = {config!r}\n"
+    try:
+        _write_atomic(module_path, source.encode('utf-8'))
+    except IOError as e:
+        # Not fatal: the bot falls back to parsing dsl.txt when the module is missing or stale
+        print(f"Could not write {module_path}: {e}")
+
 # --- Existing API Endpoints (no changes needed here) ---
 
 @app.get("/status", summary="Check the container's status")
 def get_status():
     if not client: raise HTTPException(status_code=503, detail="Docker daemon is not available.")
+    with _status_cache_lock: cached = _status_cache.get(CONTAINER_NAME)
+    if cached is not None: return cached
     try:
-        container = client.containers.get(CONTAINER_NAME)
-        return {"container_name": container.name, "status": container.status}
+        result = {"container_name": CONTAINER_NAME, "status": _container_status()}
     except docker.errors.NotFound:
-        return {"status": "not_found"}
+        result = {"status": "not_found"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    with _status_cache_lock: _status_cache[CONTAINER_NAME] = result
+    return result
 
 @app.post("/start", summary="Create and start the container with status check")
 def start_container():
     if not client: raise HTTPException(status_code=503, detail="Docker daemon is not available.")
+    _invalidate_status()
     try:
-        container = client.containers.get(CONTAINER_NAME)
-        if container.status == "running": return {"status": "already_running"}
+        if _container_status() == "running": return {"status": "already_running"}
     except docker.errors.NotFound: pass
     print(f"Starting container '{CONTAINER_NAME}' from image '{IMAGE_NAME}'...")
     try:
-        container = client.containers.run(
-            image=IMAGE_NAME, name=CONTAINER_NAME, detach=True,
-            volumes={HOST_DATA_PATH: {'bind': CONTAINER_DATA_PATH, 'mode': 'rw'}}
+        _verify_docker_resources()
+        # Raw create + start: containers.run() adds an inspect round-trip in between, and on a
+        # missing image it first tries to pull IMAGE_NAME from a registry instead of failing fast
+        client.api.create_container(
+            image=IMAGE_NAME, name=CONTAINER_NAME, detach=True, volumes=[CONTAINER_DATA_PATH],
+            host_config=client.api.create_host_config(
+                binds={DATA_VOLUME_NAME: {'bind': CONTAINER_DATA_PATH, 'mode': 'rw'}},
+                network_mode=NETWORK_NAME
+            )
         )
-        for _ in range(10):
-            time.sleep(1); container.reload()
-            if container.status == 'running': return {"status": "started_and_running"}
-            if container.status in ['exited', 'dead']:
-                logs = container.logs().decode('utf-8'); raise HTTPException(status_code=500, detail={"status": "container_failed_to_start", "logs": logs})
+        client.api.start(CONTAINER_NAME)
+        status = _wait_for_state(['running', 'exited', 'dead'])
+        # Right after start the bot is always "running", even if it is about to crash
+        if status == 'running': status = _watch_for_crash()
+        if status == 'running': return {"status": "started_and_running"}
+        if status in ['exited', 'dead']:
+            logs = _failure_logs(); raise HTTPException(status_code=500, detail={"status": "container_failed_to_start", "logs": logs})
         raise HTTPException(status_code=504, detail="Container start timed out.")
     except docker.errors.ImageNotFound: raise HTTPException(status_code=404, detail=f"Image '{IMAGE_NAME}' not found. Please build it first.")
     except Exception as e:
@@ -69,14 +333,11 @@ def start_container():
 @app.post("/stop", summary="Stop the container with status check")
 def stop_container():
     if not client: raise HTTPException(status_code=503, detail="Docker daemon is not available.")
+    _invalidate_status()
     try:
-        container = client.containers.get(CONTAINER_NAME)
-        if container.status == 'exited': return {"status": "already_stopped"}
-        container.stop()
-        for _ in range(10):
-            container.reload()
-            if container.status == 'exited': return {"status": "stopped_and_verified"}
-            time.sleep(1)
+        if _container_status() == 'exited': return {"status": "already_stopped"}
+        client.api.stop(CONTAINER_NAME)
+        if _wait_for_state(['exited']) == 'exited': return {"status": "stopped_and_verified"}
         raise HTTPException(status_code=504, detail="Container stop timed out.")
     except docker.errors.NotFound: return {"status": "not_found_or_already_stopped"}
     except Exception as e:
@@ -86,44 +347,132 @@ def stop_container():
 @app.post("/restart", summary="Restart the container with status check")
 def restart_container():
     if not client: raise HTTPException(status_code=503, detail="Docker daemon is not available.")
+    _invalidate_status()
     try:
-        container = client.containers.get(CONTAINER_NAME); container.restart()
-        for _ in range(10):
-            time.sleep(1); container.reload()
-            if container.status == 'running': return {"status": "restarted_and_running"}
-            if container.status in ['exited', 'dead']:
-                logs = container.logs().decode('utf-8'); raise HTTPException(status_code=500, detail={"status": "container_failed_on_restart", "logs": logs})
+        client.api.restart(CONTAINER_NAME)
+        status = _wait_for_state(['running', 'exited', 'dead'])
+        # Right after start the bot is always "running", even if it is about to crash
+        if status == 'running': status = _watch_for_crash()
+        if status == 'running': return {"status": "restarted_and_running"}
+        if status in ['exited', 'dead']:
+            logs = _failure_logs(); raise HTTPException(status_code=500, detail={"status": "container_failed_on_restart", "logs": logs})
         raise HTTPException(status_code=504, detail="Container restart timed out.")
     except docker.errors.NotFound: raise HTTPException(status_code=404, detail="Container not found.")
     except Exception as e:
         if isinstance(e, HTTPException): raise e
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/update-data", summary="Update a file and restart the container securely")
+@app.post("/update-data", summary="Update a file and reload the container's config")
 def update_data(request: DataUpdateRequest):
-    print("--- Starting data update process ---"); stop_container()
+    if not client: raise HTTPException(status_code=503, detail="Docker daemon is not available.")
+    if _is_reserved_data_file(request.filename):
+        raise HTTPException(status_code=400, detail=f"Writing '{request.filename}' is not allowed.")
+    print("--- Starting data update process ---")
     file_path = os.path.join(HOST_DATA_PATH, request.filename)
     try:
-        with open(file_path, 'w') as f: f.write(request.content)
+        _write_atomic(file_path, request.content.encode('utf-8'))
         print(f"Successfully updated data in {file_path}")
     except IOError as e:
-        print("File write failed. Attempting to restart container anyway..."); restart_container()
         raise HTTPException(status_code=500, detail=f"Failed to write to file: {e}")
+    if request.filename == DSL_CONFIG_FILE: _write_dsl_module(file_path, request.content)
+    # A running bot re-reads its config on SIGHUP, which avoids a full stop/start cycle. Bots built
+    # before that existed ignore the signal (as PID 1), so only signal images carrying the label.
+    try:
+        info = client.api.inspect_container(CONTAINER_NAME)
+        supports_reload = (info['Config'].get('Labels') or {}).get(RELOAD_LABEL) == "1"
+        if info['State']['Status'] == 'running' and supports_reload:
+            client.api.kill(CONTAINER_NAME, signal='SIGHUP')
+            print("--- Data update process completed successfully (config reloaded) ---")
+            return {"status": "data_updated_and_reloaded", "filename": request.filename}
+        if not supports_reload:
+            print("Container image doesn't support config reload on SIGHUP. Falling back to restart...")
+    except docker.errors.APIError as e:
+        print(f"Config reload signal failed ({e}). Falling back to restart...")
     restart_container()
     print("--- Data update process completed successfully ---")
     return {"status": "data_updated_and_restarted", "filename": request.filename}
 
+# Matches the (still JSON-escaped) text of a {"stream": "..."} build-log line
+_BUILD_STREAM_RE = re.compile(rb'"stream"\s*:\s*"((?:[^"\\]|\\.)*)"')
+_BUILD_ERROR_RE = re.compile(rb'"error"\s*:')
+
+def _iter_raw_lines(chunks):
+    """Re-splits the raw HTTP chunks of a streaming Docker API response into complete lines."""
+    pending = b""
+    for chunk in chunks:
+        if isinstance(chunk, str): chunk = chunk.encode('utf-8') # Non-chunked responses arrive as one str
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        yield from lines
+    if pending: yield pending
+
+def _build_image():
+    """Builds IMAGE_NAME from the build context and returns the build logs (raises HTTPException on failure)."""
+    print(f"--- Building image '{IMAGE_NAME}' from path '{BUILD_CONTEXT_PATH}'... ---")
+    build_log_parts = []
+    try:
+        # Only files let through by .dockerignore are tarred and sent to the daemon; the upload
+        # finishes inside build(), so the temp archive can be closed before the logs are read.
+        # The low-level API yields raw log chunks as the daemon produces them, without
+        # images.build() buffering the whole stream before returning.
+        with tar(BUILD_CONTEXT_PATH, exclude=list(BUILD_CONTEXT_EXCLUDE)) as context:
+            logs_generator = client.api.build(
+                fileobj=context,
+                custom_context=True,
+                tag=IMAGE_NAME,
+                rm=True, # Remove intermediate containers
+                decode=False
+            )
+        
+        # Stream logs from the generator and save them. Only the "stream" text is pulled out of
+        # each line; progress/aux events are skipped without being decoded into dicts.
+        for raw_line in _iter_raw_lines(logs_generator):
+            match = _BUILD_STREAM_RE.search(raw_line)
+            if match:
+                line = json.loads(b'"' + match.group(1) + b'"').strip()
+                print(line) # Print to server console in real-time
+                build_log_parts.append(line); build_log_parts.append("\n")
+            elif _BUILD_ERROR_RE.search(raw_line):
+                # The low-level API reports build failures in the stream instead of raising
+                raise docker.errors.BuildError(json.loads(raw_line)['error'], build_log_parts)
+
+    except docker.errors.BuildError as e:
+        print(f"--- Build failed! ---")
+        logs = "".join(build_log_parts) + e.msg
+        raise HTTPException(status_code=500, detail={"status": "build_failed", "logs": logs})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred during build: {e}")
+    
+    print("--- Build successful! ---")
+    return "".join(build_log_parts)
+
+def _prune_context_tags(keep_digest):
+    """
+    Removes the IMAGE_NAME:<digest> tags of earlier build contexts, so superseded images lose
+    their last tag and can be pruned instead of piling up.
+    """
+    for image in client.images.list(IMAGE_NAME):
+        for tag in image.tags:
+            repository, _, digest = tag.rpartition(':')
+            if repository != IMAGE_NAME or digest == keep_digest or not re.fullmatch(r'[0-9a-f]{12}', digest): continue
+            try:
+                client.api.remove_image(tag)
+                print(f"Removed old build tag '{tag}'.")
+            except docker.errors.APIError as e:
+                print(f"Could not remove old build tag '{tag}': {e}")
+
 # --- NEW /rebuild Endpoint ---
 @app.post("/rebuild", summary="Rebuild image and redeploy container")
 def rebuild_and_redeploy():
     """
     Automates the full update cycle:
     1. Stops and removes the current container.
-    2. Rebuilds the Docker image from the Dockerfile.
+    2. Rebuilds the Docker image from the Dockerfile (unless the build context is unchanged).
     3. Starts a new container from the new image.
     """
     if not client:
         raise HTTPException(status_code=503, detail="Docker daemon is not available.")
+    _invalidate_status()
 
     # --- Step 1: Stop and Remove Existing Container ---
     print("--- Starting rebuild process: Stopping and removing old container... ---")
@@ -140,32 +489,21 @@ def rebuild_and_redeploy():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error removing old container: {e}")
 
-    # --- Step 2: Build the New Image ---
-    print(f"--- Building image '{IMAGE_NAME}' from path '{BUILD_CONTEXT_PATH}'... ---")
+    # --- Step 2: Build the New Image (skipped if this exact context was built before) ---
     build_logs = ""
     try:
-        # The build process returns the image object and a log generator
-        _, logs_generator = client.images.build(
-            path=BUILD_CONTEXT_PATH,
-            tag=IMAGE_NAME,
-            rm=True # Remove intermediate containers
-        )
-        
-        # Stream logs from the generator and save them
-        for chunk in logs_generator:
-            if 'stream' in chunk:
-                line = chunk['stream'].strip()
-                print(line) # Print to server console in real-time
-                build_logs += line + "\n"
-
-    except docker.errors.BuildError as e:
-        print(f"--- Build failed! ---")
-        # The exception 'e' contains the build logs on failure
-        return HTTPException(status_code=500, detail={"status": "build_failed", "logs": e.msg})
+        context_digest = _build_context_digest()
+        context_tag = f"{IMAGE_NAME}:{context_digest}"
+        if client.images.list(filters={'reference': context_tag}):
+            print(f"--- Build context unchanged, reusing image '{context_tag}' ---")
+            client.api.tag(context_tag, IMAGE_NAME, 'latest')
+        else:
+            build_logs = _build_image()
+            client.api.tag(IMAGE_NAME, IMAGE_NAME, context_digest)
+        _prune_context_tags(context_digest)
+    except HTTPException: raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during build: {e}")
-    
-    print("--- Build successful! ---")
 
     # --- Step 3: Start the New Container ---
     print("--- Starting new container... ---")